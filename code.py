@@ -1,13 +1,33 @@
 import os
+import io
 import re
-import requests
+import argparse
+import time
+import zlib
+import queue
+import sqlite3
+import asyncio
+import threading
+import aiohttp
+import orjson
+from collections import deque, namedtuple
+from enum import IntEnum
 from pathlib import Path
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 from datetime import datetime
 
+try:
+    # Linear-time RE2 engine for filename parsing (pip install google-re2)
+    import re2 as regex_engine
+except ImportError:
+    regex_engine = re
+
+try:
+    # Optional, only needed to save posters as WebP (pip install Pillow)
+    from PIL import Image
+except ImportError:
+    Image = None
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -16,43 +36,179 @@ TMDB_API_KEY = os.getenv("TMDB_API_KEY")
 TORRENT_FOLDER = os.getenv("TORRENT_FOLDER", "/path/to/your/torrents")
 TMDB_API_BASE = "https://api.themoviedb.org/3"
 TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p/w500"
-MAX_WORKERS = 10  # Number of concurrent threads
+MAX_CONNECTIONS = 100  # Total concurrent connections
+MAX_CONNECTIONS_PER_HOST = 20  # Concurrent connections per TMDB host
+SEARCH_WORKERS = 8  # Concurrent TMDB searches
+DOWNLOAD_WORKERS = 16  # Concurrent poster downloads
+DOWNLOAD_QUEUE_SIZE = 64  # Searched movies waiting for a download worker
+DOWNLOAD_BUFFER_SIZE = 1 << 20  # Initial body buffer per download worker, in bytes
+KEEPALIVE_TIMEOUT = 60  # Seconds to keep idle connections open for reuse
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=10)
+WEBP_QUALITY = 80  # Quality used when transcoding posters to WebP
+
+# Retry transient failures with exponential backoff
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Stay under TMDB's search rate limit instead of backing off on 429s
+SEARCH_RATE_LIMIT = 40  # Requests allowed per window
+SEARCH_RATE_PERIOD = 10  # Window length, in seconds
+
+# Filename patterns, compiled once at import
+# Try to match pattern: Title (Year) or Title Year
+TITLE_YEAR_RE = regex_engine.compile(r'^(.+?)\s*[\(\[]?(\d{4})[\)\]]?')
+# Clean up title - remove quality indicators, tags, etc.
+TITLE_CLEANUP_RE = regex_engine.compile(r'\[.*?\]|\(.*?\)|1080p|720p|BluRay|WEBRip|YTS\.MX|YTS|S\.\d+')
 
 # Create logs directory if it doesn't exist
 LOGS_DIR = Path("poster_fetcher_logs")
 LOGS_DIR.mkdir(exist_ok=True)
 
-# Create a session with connection pooling and retries
-session = requests.Session()
-retry_strategy = Retry(
-    total=3,
-    backoff_factor=0.5,
-    status_forcelist=[429, 500, 502, 503, 504]
+# Persist TMDB search results so repeat runs skip the API
+CACHE_FILE = Path("tmdb_cache.sqlite")
+CACHE_TTL = 30 * 24 * 60 * 60  # 30 days, in seconds
+MISS_CACHE_TTL = 7 * 24 * 60 * 60  # Retry movies TMDB couldn't find after 7 days
+search_cache = sqlite3.connect(CACHE_FILE)
+search_cache.execute("PRAGMA journal_mode=WAL")
+search_cache.execute("PRAGMA synchronous=NORMAL")
+search_cache.execute(
+    "CREATE TABLE IF NOT EXISTS search("
+    "key TEXT PRIMARY KEY, payload BLOB, ts INTEGER, found INTEGER NOT NULL DEFAULT 1)"
 )
-adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=20, pool_maxsize=20)
-session.mount("http://", adapter)
-session.mount("https://", adapter)
+# Caches created before misses were stored only hold found movies
+if "found" not in [column[1] for column in search_cache.execute("PRAGMA table_info(search)")]:
+    search_cache.execute("ALTER TABLE search ADD COLUMN found INTEGER NOT NULL DEFAULT 1")
+
+class Status(IntEnum):
+    """Outcome of fetching the poster for a torrent"""
+    DOWNLOADED = 0
+    SKIPPED = 1
+    FAILED = 2
+
+# Per-torrent outcome; detail is the poster filename, or the reason on failure
+Result = namedtuple('Result', 'filename status detail')
+
+class RateLimiter:
+    """Allow at most `rate` requests in any `period`-second window"""
+    
+    def __init__(self, rate, period):
+        self.rate = rate
+        self.period = period
+        self.sent = deque()  # Send times of requests in the current window
+        self.lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until a request can be sent without exceeding the limit"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                while self.sent and now - self.sent[0] >= self.period:
+                    self.sent.popleft()
+                
+                if len(self.sent) < self.rate:
+                    self.sent.append(now)
+                    return
+                
+                await asyncio.sleep(self.sent[0] + self.period - now)
+
+search_rate_limiter = RateLimiter(SEARCH_RATE_LIMIT, SEARCH_RATE_PERIOD)
 
-def extract_movie_info(filename):
-    """Extract movie title and year from torrent filename"""
-    # Remove .torrent extension
-    name = filename.replace('.torrent', '')
+async def get_with_retries(session, url, params=None, rate_limiter=None):
+    """GET a URL, retrying connection errors and retryable status codes"""
+    # The caller owns the returned response and must release it
+    for attempt in range(MAX_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+        
+        if rate_limiter:
+            await rate_limiter.acquire()
+        
+        try:
+            response = await session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == MAX_RETRIES:
+                raise
+            continue
+        
+        if response.status in RETRY_STATUSES and attempt < MAX_RETRIES:
+            response.release()
+            continue
+        
+        response.raise_for_status()
+        return response
+
+def get_cached_search(key, include_misses=True):
+    """Look up a cached TMDB search as (hit, movie); movie is None for a cached miss"""
+    row = search_cache.execute(
+        "SELECT payload, ts, found FROM search WHERE key = ?", (key,)
+    ).fetchone()
     
-    # Try to match pattern: Title (Year) or Title Year
-    match = re.search(r'^(.+?)\s*[\(\[]?(\d{4})[\)\]]?', name)
+    if not row:
+        return False, None
+    
+    payload, ts, found = row
+    age = int(time.time()) - ts
+    
+    if found and age < CACHE_TTL:
+        return True, orjson.loads(zlib.decompress(payload))
+    if not found and include_misses and age < MISS_CACHE_TTL:
+        return True, None
+    return False, None
+
+def cache_search(key, movie):
+    """Store a TMDB search result, or None for a movie that wasn't found"""
+    payload = zlib.compress(orjson.dumps(movie)) if movie else None
+    with search_cache:
+        search_cache.execute(
+            "INSERT OR REPLACE INTO search(key, payload, ts, found) VALUES (?, ?, ?, ?)",
+            (key, payload, int(time.time()), int(movie is not None))
+        )
+
+def write_file(path, data):
+    """Write data to path with a single open/write/close"""
+    # The data is written in one call, so skip Python-level write buffering
+    with open(path, 'wb', buffering=0) as f:
+        f.write(data)
+
+def write_webp(path, data):
+    """Transcode JPEG data to a WebP file at path"""
+    with Image.open(io.BytesIO(data)) as image:
+        image.save(path, 'WEBP', quality=WEBP_QUALITY, method=4)
+
+def drain_log_queue(log_queue, log_file):
+    """Append queued log lines to log_file until a None sentinel arrives"""
+    with open(log_file, 'a', encoding='utf-8', buffering=1 << 16) as f:
+        while True:
+            message = log_queue.get()
+            if message is None:
+                return
+            
+            f.write(message + '\n')
+            # Flush once the backlog is written rather than after every line
+            if log_queue.empty():
+                f.flush()
+
+def extract_movie_info(stem):
+    """Extract movie title and year from a torrent filename without its extension"""
+    match = TITLE_YEAR_RE.search(stem)
     
     if match:
         title = match.group(1).strip()
         year = match.group(2)
-        # Clean up title - remove quality indicators, tags, etc.
-        title = re.sub(r'\[.*?\]|\(.*?\)|1080p|720p|BluRay|WEBRip|YTS\.MX|YTS|S\.\d+', '', title)
+        title = TITLE_CLEANUP_RE.sub('', title)
         title = title.strip()
         return title, year
     
     return None, None
 
-def search_movie(title, year):
-    """Search for movie on TMDB"""
+async def search_movie(session, title, year, refresh_misses=False):
+    """Search for movie on TMDB, using the on-disk cache when possible"""
+    key = f"{title.lower()}|{year}"
+    hit, movie = get_cached_search(key, include_misses=not refresh_misses)
+    if hit:
+        return movie
+    
     url = f"{TMDB_API_BASE}/search/movie"
     params = {
         "api_key": TMDB_API_KEY,
@@ -61,80 +217,130 @@ def search_movie(title, year):
     }
     
     try:
-        response = session.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data['results']:
-            return data['results'][0]
-        return None
+        response = await get_with_retries(session, url, params, search_rate_limiter)
+        async with response:
+            data = orjson.loads(await response.read())
     except Exception as e:
+        # Errors aren't cached, so the movie is searched again next run
         print(f"  ✗ Error searching for {title} ({year}): {e}")
         return None
+    
+    movie = data['results'][0] if data['results'] else None
+    cache_search(key, movie)
+    return movie
+
+def webp_path(path):
+    """Return path with its extension replaced by .webp"""
+    return os.path.splitext(path)[0] + '.webp'
+
+async def read_body(response, buffer):
+    """Read a response body into buffer, returning the number of bytes read"""
+    # buffer is reused across downloads: chunks overwrite it in place and
+    # it only grows when a body is larger than anything read before
+    received = 0
+    
+    # iter_any hands over each buffered network read whole, rather than
+    # re-slicing the buffer into fixed-size chunks
+    async for chunk in response.content.iter_any():
+        buffer[received:received + len(chunk)] = chunk
+        received += len(chunk)
+    
+    size = response.content_length
+    if size and 'Content-Encoding' not in response.headers and received != size:
+        raise ValueError(f"Expected {size} bytes, received {received}")
+    return received
 
-def download_poster(poster_path, save_path):
-    """Download poster image from TMDB"""
+async def download_poster(session, poster_path, save_path, buffer=None, webp=False, keep_original=False):
+    """Download poster image from TMDB, optionally saving it as WebP"""
     if not poster_path:
         return False
     
     url = f"{TMDB_IMAGE_BASE}{poster_path}"
+    if buffer is None:
+        buffer = bytearray()
     
     try:
-        response = session.get(url, timeout=10)
-        response.raise_for_status()
+        response = await get_with_retries(session, url)
+        async with response:
+            size = await read_body(response, buffer)
         
-        with open(save_path, 'wb') as f:
-            f.write(response.content)
+        # Hand the whole file to a worker thread in one go, rather than
+        # one executor round-trip per open/write/close. The views must be
+        # released before the buffer can be resized by the next download.
+        with memoryview(buffer) as view, view[:size] as content:
+            if webp:
+                await asyncio.to_thread(write_webp, webp_path(save_path), content)
+            if not webp or keep_original:
+                await asyncio.to_thread(write_file, save_path, content)
         return True
     except Exception as e:
+        # Don't leave a truncated poster behind to be skipped on the next run
+        Path(save_path).unlink(missing_ok=True)
+        Path(webp_path(save_path)).unlink(missing_ok=True)
         print(f"  ✗ Error downloading poster: {e}")
         return False
 
-def process_single_torrent(torrent_file, folder):
-    """Process a single torrent file"""
-    filename = torrent_file.name
-    result = {
-        'filename': filename,
-        'success': False,
-        'message': ''
-    }
-    
-    # Extract movie info
-    title, year = extract_movie_info(filename)
-    
-    if not title or not year:
-        result['message'] = "Could not parse movie info"
-        return result
+def scan_folder(folder):
+    """List torrent and existing poster filenames in a single directory read"""
+    torrent_files = []
+    existing_posters = set()
     
-    # Create clean poster filename: "Title (Year).jpg"
-    poster_filename = f"{title} ({year}).jpg"
-    poster_path = folder / poster_filename
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            # is_file() uses the directory entry type, so no extra stat
+            if not entry.is_file():
+                continue
+            if entry.name.endswith('.torrent'):
+                torrent_files.append(entry.name)
+            elif entry.name.endswith(('.jpg', '.webp')):
+                existing_posters.add(entry.name)
     
-    if poster_path.exists():
-        result['success'] = True
-        result['message'] = f"Poster already exists: {poster_filename}"
-        return result
-    
-    # Search for movie
-    movie = search_movie(title, year)
-    
-    if not movie:
-        result['message'] = f"Movie not found: {title} ({year})"
-        return result
-    
-    # Download poster
-    success = download_poster(movie.get('poster_path'), poster_path)
-    
-    if success:
-        result['success'] = True
-        result['message'] = f"✓ Downloaded: {poster_filename}"
-    else:
-        result['message'] = f"Failed to download poster for: {title}"
+    return torrent_files, existing_posters
+
+async def search_worker(session, pending, download_queue, results, folder, refresh_misses):
+    """Search TMDB for pending movies and queue their posters for download"""
+    for title, year in pending:
+        try:
+            movie = await search_movie(session, title, year, refresh_misses)
+        except Exception as e:
+            results[(title, year)] = (Status.FAILED, f"Unexpected error: {e}")
+            continue
+        
+        if not movie:
+            results[(title, year)] = (Status.FAILED, f"Movie not found: {title} ({year})")
+            continue
+        
+        poster_path = os.path.join(folder, f"{title} ({year}).jpg")
+        await download_queue.put((title, year, movie.get('poster_path'), poster_path))
+
+async def download_worker(session, download_queue, results, webp=False, keep_original=False):
+    """Download queued posters until the end-of-stream sentinel arrives"""
+    # Reused for every poster this worker downloads
+    buffer = bytearray(DOWNLOAD_BUFFER_SIZE)
     
-    return result
+    while True:
+        job = await download_queue.get()
+        if job is None:
+            return
+        
+        title, year, tmdb_poster_path, poster_path = job
+        
+        try:
+            success = await download_poster(
+                session, tmdb_poster_path, poster_path, buffer, webp, keep_original
+            )
+        except Exception as e:
+            results[(title, year)] = (Status.FAILED, f"Unexpected error: {e}")
+            continue
+        
+        if success:
+            saved_path = webp_path(poster_path) if webp else poster_path
+            results[(title, year)] = (Status.DOWNLOADED, os.path.basename(saved_path))
+        else:
+            results[(title, year)] = (Status.FAILED, f"Failed to download poster for: {title}")
 
-def process_torrents(folder_path):
-    """Process all torrent files in folder with parallel downloads"""
+async def process_torrents(folder_path, refresh_misses=False, webp=False, keep_original=False):
+    """Process all torrent files in folder with concurrent downloads"""
     folder = Path(folder_path)
     
     if not folder.exists():
@@ -145,92 +351,175 @@ def process_torrents(folder_path):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     log_file = LOGS_DIR / f"poster_fetch_{timestamp}.log"
     
+    # A single writer thread keeps the log file open for the whole run
+    log_queue = queue.Queue()
+    log_writer = threading.Thread(target=drain_log_queue, args=(log_queue, log_file), daemon=True)
+    log_writer.start()
+    
     def log_and_print(message):
         """Write to both console and log file"""
         print(message)
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(message + '\n')
-    
-    # Start logging
-    log_and_print(f"Movie Poster Fetcher - Log Started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    log_and_print(f"Torrent Folder: {folder_path}")
-    log_and_print("=" * 70)
-    
-    torrent_files = list(folder.glob("*.torrent"))
-    
-    if not torrent_files:
-        log_and_print("No .torrent files found in folder")
-        return
-    
-    log_and_print(f"Found {len(torrent_files)} torrent files")
-    log_and_print(f"Processing with {MAX_WORKERS} concurrent threads...")
-    log_and_print("")
-    
-    success_count = 0
-    skip_count = 0
-    fail_count = 0
+        log_queue.put(message)
     
-    # Track results for detailed logging
-    results = {
-        'downloaded': [],
-        'skipped': [],
-        'failed': []
-    }
-    
-    # Process torrents in parallel
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        # Submit all tasks
-        future_to_file = {
-            executor.submit(process_single_torrent, tf, folder): tf 
-            for tf in torrent_files
-        }
+    try:
+        # Start logging
+        log_and_print(f"Movie Poster Fetcher - Log Started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        log_and_print(f"Torrent Folder: {folder_path}")
+        log_and_print("=" * 70)
+        
+        torrent_files, existing_posters = scan_folder(folder)
+        
+        if not torrent_files:
+            log_and_print("No .torrent files found in folder")
+            return
+        
+        log_and_print(f"Found {len(torrent_files)} torrent files")
+        
+        # Group torrents by movie so duplicates share one search and download.
+        # Movies that already have a poster are settled here and never queued.
+        torrent_results = []
+        movies = {}
         
-        # Process completed tasks as they finish
-        for future in as_completed(future_to_file):
-            result = future.result()
+        for filename in torrent_files:
+            # scan_folder only returns names ending in ".torrent"
+            title, year = extract_movie_info(filename[:-8])
             
-            if result['success']:
-                if "already exists" in result['message']:
-                    skip_count += 1
-                    msg = f"⊙ {result['filename']}: Already exists"
-                    results['skipped'].append(result['filename'])
-                else:
-                    success_count += 1
-                    msg = f"✓ {result['filename']}: Downloaded"
-                    results['downloaded'].append(result['filename'])
+            if not title or not year:
+                torrent_results.append(Result(filename, Status.FAILED, "Could not parse movie info"))
+                continue
+            
+            # Create clean poster filename: "Title (Year).jpg", or .webp
+            poster_name = f"{title} ({year})"
+            existing = [
+                f"{poster_name}{ext}" for ext in ('.jpg', '.webp')
+                if f"{poster_name}{ext}" in existing_posters
+            ]
+            
+            if existing:
+                torrent_results.append(Result(filename, Status.SKIPPED, existing[0]))
+                continue
+            
+            movies.setdefault((title, year), []).append(filename)
+        
+        log_and_print(f"Fetching posters for {len(movies)} distinct movies")
+        log_and_print(f"Processing with {SEARCH_WORKERS} search and {DOWNLOAD_WORKERS} download workers...")
+        log_and_print("")
+        
+        success_count = 0
+        skip_count = 0
+        fail_count = 0
+        
+        # Track results for detailed logging
+        results = {
+            'downloaded': [],
+            'skipped': [],
+            'failed': []
+        }
+        
+        # Workers build poster paths from a plain string instead of Path objects
+        folder_str = str(folder)
+        
+        # Searches feed a queue drained by download workers, so the two overlap
+        pending = iter(movies)
+        download_queue = asyncio.Queue(maxsize=DOWNLOAD_QUEUE_SIZE)
+        movie_results = {}
+        
+        connector = aiohttp.TCPConnector(
+            limit=MAX_CONNECTIONS,
+            limit_per_host=MAX_CONNECTIONS_PER_HOST,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            # Only two hosts are ever contacted, so resolve each once per run
+            ttl_dns_cache=None
+        )
+        async with aiohttp.ClientSession(connector=connector) as session:
+            downloaders = [
+                asyncio.create_task(
+                    download_worker(session, download_queue, movie_results, webp, keep_original)
+                )
+                for _ in range(DOWNLOAD_WORKERS)
+            ]
+        
+            try:
+                await asyncio.gather(*(
+                    search_worker(
+                        session, pending, download_queue, movie_results,
+                        folder_str, refresh_misses
+                    )
+                    for _ in range(SEARCH_WORKERS)
+                ))
+            finally:
+                # One end-of-stream sentinel per download worker
+                for _ in downloaders:
+                    await download_queue.put(None)
+                await asyncio.gather(*downloaders)
+        
+        for movie_key, filenames in movies.items():
+            for filename in filenames:
+                torrent_results.append(Result(filename, *movie_results[movie_key]))
+        
+        for result in torrent_results:
+            if result.status == Status.SKIPPED:
+                skip_count += 1
+                msg = f"⊙ {result.filename}: Already exists"
+                results['skipped'].append(result.filename)
+            elif result.status == Status.DOWNLOADED:
+                success_count += 1
+                msg = f"✓ {result.filename}: Downloaded"
+                results['downloaded'].append(result.filename)
             else:
                 fail_count += 1
-                msg = f"✗ {result['filename']}: {result['message']}"
-                results['failed'].append({'filename': result['filename'], 'reason': result['message']})
-            
+                msg = f"✗ {result.filename}: {result.detail}"
+                results['failed'].append({'filename': result.filename, 'reason': result.detail})
+        
             log_and_print(msg)
+        
+        # Print summary
+        log_and_print("")
+        log_and_print("=" * 70)
+        log_and_print("Summary:")
+        log_and_print(f"  Downloaded: {success_count}")
+        log_and_print(f"  Skipped (already exists): {skip_count}")
+        log_and_print(f"  Failed: {fail_count}")
+        log_and_print(f"  Total: {len(torrent_files)}")
+        
+        # Detailed breakdown
+        if results['downloaded']:
+            log_and_print("\nNewly Downloaded:")
+            for filename in sorted(results['downloaded']):
+                log_and_print(f"  • {filename}")
+        
+        if results['failed']:
+            log_and_print("\nFailed:")
+            for item in sorted(results['failed'], key=lambda x: x['filename']):
+                log_and_print(f"  • {item['filename']}")
+                log_and_print(f"    Reason: {item['reason']}")
+        
+        log_and_print("")
+        log_and_print(f"Log file saved: {log_file}")
+        log_and_print("=" * 70)
+    finally:
+        log_queue.put(None)
+        log_writer.join()
+
+async def main_async():
+    parser = argparse.ArgumentParser(description="Download TMDB posters for torrent files")
+    parser.add_argument(
+        "--refresh-misses",
+        action="store_true",
+        help="Search TMDB again for movies cached as not found"
+    )
+    parser.add_argument(
+        "--webp",
+        action="store_true",
+        help="Save posters as WebP instead of JPEG (requires Pillow)"
+    )
+    parser.add_argument(
+        "--keep-original",
+        action="store_true",
+        help="With --webp, also keep the downloaded JPEG"
+    )
+    args = parser.parse_args()
     
-    # Print summary
-    log_and_print("")
-    log_and_print("=" * 70)
-    log_and_print("Summary:")
-    log_and_print(f"  Downloaded: {success_count}")
-    log_and_print(f"  Skipped (already exists): {skip_count}")
-    log_and_print(f"  Failed: {fail_count}")
-    log_and_print(f"  Total: {len(torrent_files)}")
-    
-    # Detailed breakdown
-    if results['downloaded']:
-        log_and_print("\nNewly Downloaded:")
-        for filename in sorted(results['downloaded']):
-            log_and_print(f"  • {filename}")
-    
-    if results['failed']:
-        log_and_print("\nFailed:")
-        for item in sorted(results['failed'], key=lambda x: x['filename']):
-            log_and_print(f"  • {item['filename']}")
-            log_and_print(f"    Reason: {item['reason']}")
-    
-    log_and_print("")
-    log_and_print(f"Log file saved: {log_file}")
-    log_and_print("=" * 70)
-
-def main():
     # Check if API key is set
     if not TMDB_API_KEY:
         print("ERROR: TMDB_API_KEY not found in .env file!")
@@ -244,10 +533,16 @@ def main():
         print("Please add to .env file: TORRENT_FOLDER=/path/to/your/torrents")
         return
     
+    # Check that Pillow is available for WebP output
+    if args.webp and Image is None:
+        print("ERROR: --webp requires Pillow!")
+        print("Install it with: pip install Pillow")
+        return
+    
     print("Movie Poster Fetcher (Parallel Mode)")
     print("=" * 70)
-    process_torrents(TORRENT_FOLDER)
+    await process_torrents(TORRENT_FOLDER, args.refresh_misses, args.webp, args.keep_original)
     print("Done!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main_async())
\ No newline at end of file